@@ -1,6 +1,6 @@
 import math
 
-from graphics import Circle, GraphicsObject, GraphWin, Line, Point, Polygon  # type: ignore
+from graphics import Circle, GraphicsObject, GraphWin, Line, Point  # type: ignore
 
 from ant.grid import Grid, GridCoord, HexGrid
 from ant.types import CellColour
@@ -17,6 +17,10 @@ COLOURS = [
     "purple",
 ]
 
+# Display colour for each cell colour, so render() doesn't need a modulo per cell.
+# Cell colours beyond the end of this fall back to the modulo.
+_COLOUR_LUT = [COLOURS[i % len(COLOURS)] for i in range(256)]
+
 
 class Display:
     def __init__(
@@ -28,15 +32,19 @@ class Display:
         show_ants: bool = True,
     ):
         self._data_grid = grid
+        # render() only redraws the cells written since it last ran
+        grid.track_dirty()
         self._window_x = window_x
         self._window_y = window_y
         self._show_cell_borders = show_cell_borders
         self._show_ants = show_ants
 
-        self._display_grid: dict[GridCoord, Polygon] = {}
+        # The canvas item drawn for each cell, and the cell colour it was drawn in
+        self._display_grid: dict[GridCoord, tuple[int, CellColour]] = {}
         self._window = GraphWin("ANT", window_x, window_y, autoflush=False)
         self._window.setBackground(COLOURS[0])
-        self._prev_bbox = (0, 0, 0, 0)
+        # The (scale, x_offset, y_offset) used to draw what's currently on the canvas
+        self._transform: tuple[float, float, float] | None = None
 
         self._display_ants: list[GraphicsObject] = []
 
@@ -65,35 +73,53 @@ class Display:
             scale = y_scale
             x_offset -= (self._window_x / scale - x_size) // 2
 
-        # If bbox changes, need a full redraw
-        if bbox != self._prev_bbox:
-            for item in self._window.items[:]:
-                item.undraw()
-            self._display_grid = {}
-            self._prev_bbox = bbox
-
-        for grid_coord, colour in self._data_grid:
-            display_colour = COLOURS[colour % len(COLOURS)]
-
-            if grid_coord in self._display_grid:
-                # Change colour if necessary
-                polygon = self._display_grid[grid_coord]
-                if polygon.config["fill"] != display_colour:
-                    polygon.setFill(display_colour)
+        # If the bbox changes, the cells already on the canvas need moving. Rather than
+        # recomputing all of their vertices, transform them in place on the canvas.
+        transform = (scale, x_offset, y_offset)
+        if self._transform is not None and transform != self._transform:
+            prev_scale, prev_x_offset, prev_y_offset = self._transform
+            ratio = scale / prev_scale
+            self._window.scale("all", 0, 0, ratio, ratio)
+            self._window.move(
+                "all",
+                (prev_x_offset - x_offset) * scale,
+                (prev_y_offset - y_offset) * scale,
+            )
+        self._transform = transform
+
+        x_shift = x_offset * scale
+        y_shift = y_offset * scale
+        outline = "black" if self._show_cell_borders else ""
+
+        # Only touch the cells that have changed since the last render
+        for grid_coord in self._data_grid.pop_dirty():
+            colour = self._data_grid[grid_coord]
+            drawn = self._display_grid.get(grid_coord)
+            if drawn is not None and drawn[1] == colour:
+                continue
+
+            try:
+                display_colour = _COLOUR_LUT[colour]
+            except IndexError:
+                display_colour = COLOURS[colour % len(COLOURS)]
+
+            # Cells are drawn straight onto the canvas rather than via graphics.Polygon,
+            # which would cost a Point object per vertex and a Polygon object per cell
+            if drawn is not None:
+                item_id = drawn[0]
+                self._window.itemconfig(item_id, fill=display_colour)
             else:
-                coords = []
-                for display_coord in self._data_grid.get_cell_vertices(grid_coord):
-                    x = (display_coord.x - x_offset) * scale
-                    y = (display_coord.y - y_offset) * scale
-                    coords.append(Point(x, y))
-
-                polygon = Polygon(*coords)
-                if not self._show_cell_borders:
-                    polygon.setOutline("")
-                polygon.setFill(display_colour)
-
-                self._display_grid[grid_coord] = polygon
-                polygon.draw(self._window)
+                item_id = self._window.create_polygon(
+                    [
+                        coord
+                        for x, y in self._data_grid.get_cell_vertices(grid_coord)
+                        for coord in (x * scale - x_shift, y * scale - y_shift)
+                    ],
+                    fill=display_colour,
+                    outline=outline,
+                )
+
+            self._display_grid[grid_coord] = (item_id, colour)
 
         if self._show_ants:
             for ant_shape in self._display_ants:
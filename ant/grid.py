@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import re
+import sys
+import warnings
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Iterable, NamedTuple
+from collections import Counter
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Iterable, Mapping, NamedTuple
 
 from ant.types import AntColour, CardinalDirection, CellColour, Rule
 
@@ -18,7 +23,41 @@ class AntState(NamedTuple):
     colour: AntColour
 
 
+class _Cycle(NamedTuple):
+    # A run of steps which an ant repeats, shifted along by the same amount each time.
+    # Cells are relative to the ant's position at the start of the cycle.
+    period: int
+    shift: tuple[int, int]
+    # The most cycles back that a cycle can overlap with
+    overlap: int
+    # Cells which no earlier cycle visits, and the colour the ant needs to find in them
+    fresh: list[tuple[tuple[int, int], CellColour]]
+    # Every cell the cycle visits, and the colour it leaves it
+    written: list[tuple[tuple[int, int], CellColour]]
+    # Cells which no later cycle visits, and the colour the cycle leaves them
+    trail: list[tuple[tuple[int, int], CellColour]]
+
+
 class Ant:
+    __slots__ = (
+        "_grid",
+        "_x",
+        "_y",
+        "_prev_x",
+        "_prev_y",
+        "_heading",
+        "_colour",
+        "_rules",
+        "_num_cell_colours",
+        "_rule_table",
+        "_cycle_check_interval",
+        "_steps_until_cycle_check",
+    )
+
+    # How many steps are recorded when looking for a cycle. This limits the longest
+    # cycle which can be found, since it has to be seen repeating.
+    _CYCLE_WINDOW = 2048
+
     def __init__(
         self,
         grid: Grid,
@@ -26,15 +65,74 @@ class Ant:
         initial_state: AntState,
     ):
         self._grid = grid
-        self._state = initial_state
-        self._prev_position = initial_state.position
 
-        self._rules: dict[RuleKey, Rule] = {}
-        for rule in rules:
-            key = RuleKey(ant_colour=rule.ant_colour, cell_colour=rule.cell_colour)
-            if key in self._rules:
-                print(f"Warning: duplicate rules for {key}")
-            self._rules[key] = rule
+        # The ant's state is kept as plain ints; GridCoord and AntState objects are only
+        # built when asked for via the properties below.
+        self._x = self._prev_x = initial_state.position.x
+        self._y = self._prev_y = initial_state.position.y
+        self._colour = initial_state.colour
+
+        rules = list(rules)
+        self._rules: dict[RuleKey, Rule] = {
+            RuleKey(ant_colour=rule.ant_colour, cell_colour=rule.cell_colour): rule
+            for rule in rules
+        }
+        if len(self._rules) != len(rules):
+            counts = Counter(
+                RuleKey(ant_colour=rule.ant_colour, cell_colour=rule.cell_colour)
+                for rule in rules
+            )
+            duplicates = [key for key, count in counts.items() if count > 1]
+            warnings.warn(
+                f"Duplicate rules for {duplicates}; the last of each is used",
+                stacklevel=2,
+            )
+
+        # Colours index straight into the rule table below, where a negative index would
+        # silently pick out some other rule
+        if initial_state.colour < 0 or any(
+            min(rule.ant_colour, rule.new_ant_colour, rule.cell_colour) < 0
+            for rule in self._rules.values()
+        ):
+            raise ValueError(
+                "Ant colours, and the cell colours in rules, must not be negative"
+            )
+
+        # Every move keeps the ant on a valid cell, so step_many() only needs the
+        # starting position to be checked.
+        grid._check_coord(initial_state.position)
+        grid._check_heading(initial_state.position, initial_state.direction)
+        # The direction is kept as its index into grid._headings
+        self._heading = grid._headings.index(initial_state.direction)
+
+        # Flatten the rules into a table indexed by
+        # ant_colour * num_cell_colours + cell_colour, so that step() doesn't need to
+        # build and hash a RuleKey every time. Turns are stored as an index into the
+        # grid's direction table, so they don't need wrapping on every step.
+        num_turns = len(grid._heading_table[self._heading])
+        num_ant_colours = 1 + max(
+            [initial_state.colour]
+            + [max(r.ant_colour, r.new_ant_colour) for r in self._rules.values()]
+        )
+        self._num_cell_colours = (
+            max((key.cell_colour for key in self._rules), default=-1) + 1
+        )
+        self._rule_table: list[tuple[AntColour, CellColour, int] | None] = [None] * (
+            num_ant_colours * self._num_cell_colours
+        )
+        for key, rule in self._rules.items():
+            self._rule_table[
+                key.ant_colour * self._num_cell_colours + key.cell_colour
+            ] = (
+                rule.new_ant_colour,
+                rule.new_cell_colour,
+                (rule.turn - 1) % num_turns,
+            )
+
+        # How many steps fast_forward() waits after failing to find a cycle before
+        # looking again, and how many of those are still to go (across calls)
+        self._cycle_check_interval = self._CYCLE_WINDOW
+        self._steps_until_cycle_check = 0
 
         grid.add_ant(self)
 
@@ -43,45 +141,323 @@ class Ant:
         return self._grid
 
     def step(self):
-        # Look up the rule
-        rule_key = RuleKey(
-            ant_colour=self.state.colour, cell_colour=self._grid[self.state.position]
-        )
-        rule = self._rules[rule_key]
+        self.step_many(1)
 
-        # change the colour of the current cell
-        self._grid[self.state.position] = rule.new_cell_colour
+    def step_many(self, steps: int) -> None:
+        """
+        Advances the ant by the given number of steps.
 
-        # calculate the new direction, then move the ant in that direction
-        new_direction = self._grid.get_direction(
-            self.state.position, self.state.direction, rule.turn
-        )
-        new_position = self._grid.get_neighbour(self.state.position, new_direction)
+        This is equivalent to calling step() repeatedly, but keeps the ant's state in
+        locals for the duration of the loop, which is considerably faster.
+        """
+        _step_ants([self], steps)
+
+    def fast_forward(self, steps: int) -> None:
+        """
+        Advances the ant by the given number of steps, skipping over repeated cycles.
 
-        self._prev_position = self.state.position
-        self._state = AntState(
-            position=new_position, direction=new_direction, colour=rule.new_ant_colour
+        Some ants settle into a cycle which repeats forever, shifted along a little each
+        time (eg the 104 step "highway" of Langton's ant). Once the ant's recent steps
+        are seen to repeat, and the cells ahead of it hold what it found last time
+        round, whole cycles are written to the grid without stepping through them.
+
+        The end result is exactly the same as calling step_many().
+        """
+        while steps > 0:
+            if self._steps_until_cycle_check:
+                batch = min(steps, self._steps_until_cycle_check)
+                self.step_many(batch)
+                steps -= batch
+                self._steps_until_cycle_check -= batch
+                continue
+
+            # Leave some steps over to skip through if a cycle turns up
+            window = min(steps // 2, self._CYCLE_WINDOW)
+            if not window:
+                self.step_many(steps)
+                break
+            positions, seen = self._step_recording(window)
+            steps -= window
+
+            skipped = 0
+            cycle = self._find_cycle(positions, seen)
+            if cycle is not None:
+                skipped = self._skip_cycles(cycle, steps // cycle.period)
+                steps -= cycle.period * skipped
+
+            if skipped:
+                self._cycle_check_interval = self._CYCLE_WINDOW
+            else:
+                # Back off, so that ants which never settle down don't keep paying for
+                # the (slower) recorded steps
+                self._steps_until_cycle_check = self._cycle_check_interval
+                self._cycle_check_interval *= 2
+
+    def _step_recording(
+        self, steps: int
+    ) -> tuple[list[tuple[int, int]], list[tuple[int, AntColour, CellColour]]]:
+        # Steps the ant, noting its position before each step (and after the last one),
+        # and what it saw: its heading, its colour and the cell's colour.
+        record: list[tuple[int, int, int, AntColour, CellColour]] = []
+        _step_ants([self], steps, record)
+
+        positions = [(x, y) for x, y, _, _, _ in record]
+        positions.append((self._x, self._y))
+        seen = [
+            (heading, ant_colour, cell_colour)
+            for _, _, heading, ant_colour, cell_colour in record
+        ]
+
+        return positions, seen
+
+    def _find_cycle(
+        self,
+        positions: list[tuple[int, int]],
+        seen: list[tuple[int, AntColour, CellColour]],
+    ) -> _Cycle | None:
+        num_steps = len(seen)
+        for period in range(1, num_steps // 2 + 1):
+            start = num_steps - period
+            # The last two cycles must have seen exactly the same things
+            if (
+                seen[-1] != seen[-1 - period]
+                or seen[start:] != seen[start - period : start]
+            ):
+                continue
+            cycle = self._describe_cycle(positions, seen, period)
+            if cycle is not None:
+                return cycle
+        return None
+
+    def _describe_cycle(
+        self,
+        positions: list[tuple[int, int]],
+        seen: list[tuple[int, AntColour, CellColour]],
+        period: int,
+    ) -> _Cycle | None:
+        grid = self._grid
+        get_colour = grid._grid.get
+        default_colour = grid._default_colour
+
+        num_steps = len(seen)
+        start = num_steps - period
+        start_x, start_y = positions[start]
+        dx = positions[num_steps][0] - start_x
+        dy = positions[num_steps][1] - start_y
+
+        if dy & 1 and grid._heading_vectors[0] != grid._heading_vectors[1]:
+            # The ant's moves depend on the row parity, which would flip next cycle
+            return None
+
+        # What each cell in the last cycle held when the ant first got there. Nothing
+        # has touched these cells since, so the grid now holds what the cycle left.
+        first_seen: dict[tuple[int, int], CellColour] = {}
+        for (x, y), (_, _, cell_colour) in zip(
+            positions[start:num_steps], seen[start:]
+        ):
+            first_seen.setdefault((x - start_x, y - start_y), cell_colour)
+        written = [
+            ((cx, cy), get_colour((start_x + cx, start_y + cy), default_colour))
+            for cx, cy in first_seen
+        ]
+
+        # Find how many cycles back a cycle can overlap with
+        if dx == dy == 0:
+            overlap = 1
+        else:
+            overlap = 0
+            width = max(cx for cx, _ in first_seen) - min(cx for cx, _ in first_seen)
+            height = max(cy for _, cy in first_seen) - min(cy for _, cy in first_seen)
+            m = 1
+            while m * abs(dx) <= width and m * abs(dy) <= height:
+                if any(
+                    (cx + m * dx, cy + m * dy) in first_seen for cx, cy in first_seen
+                ):
+                    overlap = m
+                m += 1
+
+        # Every cell a cycle reads which an earlier cycle wrote must have been written
+        # by that cycle repeating too, so the ant has to have been in the cycle for that
+        # many cycles before this one.
+        first = num_steps - (overlap + 1) * period
+        if first < 0 or seen[first:start] != seen[first + period :]:
+            return None
+        for t in range(first, start + 1):
+            x, y = positions[t]
+            if positions[t + period] != (x + dx, y + dy):
+                return None
+
+        shifts = range(1, overlap + 1)
+        fresh = [
+            ((cx, cy), colour)
+            for (cx, cy), colour in first_seen.items()
+            if all((cx + m * dx, cy + m * dy) not in first_seen for m in shifts)
+        ]
+        trail = [
+            ((cx, cy), colour)
+            for (cx, cy), colour in written
+            if all((cx - m * dx, cy - m * dy) not in first_seen for m in shifts)
+        ]
+
+        return _Cycle(
+            period=period,
+            shift=(dx, dy),
+            overlap=overlap,
+            fresh=fresh,
+            written=written,
+            trail=trail,
         )
 
+    def _skip_cycles(self, cycle: _Cycle, max_cycles: int) -> int:
+        # Applies up to max_cycles repeats of the cycle (which the ant has just finished)
+        # to the grid, and returns how many it applied.
+        grid = self._grid
+        get_colour = grid._grid.get
+        default_colour = grid._default_colour
+        set_colour = grid._set
+        dx, dy = cycle.shift
+
+        # Each cycle repeats as long as the cells it visits first hold the same as last
+        # time; every other cell it visits was last written by an earlier cycle.
+        cycles = 0
+        while cycles < max_cycles:
+            x = self._x + cycles * dx
+            y = self._y + cycles * dy
+            if any(
+                get_colour((x + cx, y + cy), default_colour) != colour
+                for (cx, cy), colour in cycle.fresh
+            ):
+                break
+            cycles += 1
+
+        # Only the trail of each cycle survives the cycles after it, apart from the last
+        # few cycles, which nothing else gets to overwrite. The writes are all worked
+        # out before the grid or the ant is touched, so neither is left half updated.
+        writes: list[tuple[int, int, CellColour]] = []
+        for i in range(cycles):
+            x = self._x + i * dx
+            y = self._y + i * dy
+            cells = cycle.trail if i < cycles - cycle.overlap else cycle.written
+            writes.extend((x + cx, y + cy, colour) for (cx, cy), colour in cells)
+
+        self._x += cycles * dx
+        self._y += cycles * dy
+        self._prev_x += cycles * dx
+        self._prev_y += cycles * dy
+        for x, y, colour in writes:
+            set_colour(x, y, colour)
+
+        return cycles
+
     @property
-    def state(self):
-        return self._state
+    def state(self) -> AntState:
+        return AntState(
+            position=GridCoord(self._x, self._y),
+            direction=self._grid._headings[self._heading],
+            colour=self._colour,
+        )
 
     @property
     def prev_position(self) -> GridCoord:
         # Useful for drawing the ant, when we usually want to show where it just was
-        return self._prev_position
+        return GridCoord(self._prev_x, self._prev_y)
 
     def __repr__(self):
         return f"Ant(state={self.state})"
 
 
-@dataclass(frozen=True)
-class Vector:
+def step_ants(ants: list[Ant], steps: int) -> None:
+    """
+    Advances all the ants (which must share a grid) by the given number of steps.
+
+    The ants take turns one step at a time, so this is equivalent to calling step() on
+    each ant in turn.
+    """
+    if len(ants) == 1:
+        # A lone ant may settle into a cycle which can be skipped through
+        ants[0].fast_forward(steps)
+    elif ants:
+        _step_ants(ants, steps)
+
+
+def _step_ants(
+    ants: list[Ant],
+    steps: int,
+    record: list[tuple[int, int, int, AntColour, CellColour]] | None = None,
+) -> None:
+    # The stepping loop behind Ant.step_many() and step_ants(). The ants' state is kept
+    # in local lists for the duration of the loop, rather than going through
+    # attributes on every step. If given, record gets each ant's position, heading,
+    # colour and cell colour appended before every step.
+    grid = ants[0]._grid
+    # Reads go straight to the grid's dict, saving a method call on every step
+    get_colour = grid._grid.get
+    default_colour = grid._default_colour
+    set_colour = grid._set
+    heading_table = grid._heading_table
+    heading_vectors = grid._heading_vectors
+    rule_tables = [ant._rule_table for ant in ants]
+    num_cell_colours = [ant._num_cell_colours for ant in ants]
+
+    xs = [ant._x for ant in ants]
+    ys = [ant._y for ant in ants]
+    prev_xs = [ant._prev_x for ant in ants]
+    prev_ys = [ant._prev_y for ant in ants]
+    headings = [ant._heading for ant in ants]
+    ant_colours = [ant._colour for ant in ants]
+
+    indices = range(len(ants))
+
+    try:
+        for _ in range(steps):
+            for i in indices:
+                x = xs[i]
+                y = ys[i]
+                ant_colour = ant_colours[i]
+
+                # Look up the rule
+                cell_colour = get_colour((x, y), default_colour)
+                rule = None
+                num_colours = num_cell_colours[i]
+                if 0 <= cell_colour < num_colours:
+                    rule = rule_tables[i][ant_colour * num_colours + cell_colour]
+                if rule is None:
+                    raise KeyError(
+                        RuleKey(ant_colour=ant_colour, cell_colour=cell_colour)
+                    )
+                if record is not None:
+                    record.append((x, y, headings[i], ant_colour, cell_colour))
+                ant_colours[i], new_cell_colour, turn_index = rule
+
+                # change the colour of the current cell
+                set_colour(x, y, new_cell_colour)
+
+                # calculate the new direction, then move the ant in that direction
+                heading = headings[i] = heading_table[headings[i]][turn_index]
+                dx, dy = heading_vectors[y & 1][heading]
+                prev_xs[i] = x
+                prev_ys[i] = y
+                xs[i] = x + dx
+                ys[i] = y + dy
+    finally:
+        # Write back however far we got, even if a rule was missing
+        for i, ant in enumerate(ants):
+            ant._x, ant._y = xs[i], ys[i]
+            ant._prev_x, ant._prev_y = prev_xs[i], prev_ys[i]
+            ant._heading = headings[i]
+            ant._colour = ant_colours[i]
+
+
+# Vector and GridCoord are NamedTuples rather than dataclasses, since they're used as
+# dict keys and tuples hash (and compare) in C. Their __add__ methods replace tuple
+# concatenation, and only accept Vectors.
+
+
+class Vector(NamedTuple):
     dx: int
     dy: int
 
-    def __add__(self, other: Vector):
+    def __add__(self, other: Vector):  # type: ignore[override]
         if not isinstance(other, Vector):
             return NotImplemented
 
@@ -94,12 +470,11 @@ class Vector:
         return self + other
 
 
-@dataclass(frozen=True)
-class GridCoord:
+class GridCoord(NamedTuple):
     x: int
     y: int
 
-    def __add__(self, vector: Vector):
+    def __add__(self, vector: Vector):  # type: ignore[override]
         if not isinstance(vector, Vector):
             return NotImplemented
 
@@ -144,26 +519,63 @@ class Grid(ABC):
     and positive X going right.
     """
 
-    _cell_vertices_cache: dict[GridCoord, tuple[DisplayCoord, ...]]
+    # Whether cells need queueing to build up the display bbox (see __init__). Grids
+    # which can work it out directly from the bbox, or can't draw cells at all, turn
+    # this off.
+    _queue_display_bbox_cells = True
 
     def __init__(
         self, default_colour: CellColour = CellColour(0), store_default: bool = False
     ):
         self._default_colour = default_colour
         self._store_default = store_default
-        self._grid: dict[GridCoord, CellColour] = {}
+        # Cells are keyed by plain (x, y) tuples rather than GridCoords, since tuples
+        # hash much faster; GridCoords are only built at the edges of the API.
+        self._grid: dict[tuple[int, int], CellColour] = {}
+
+        # Cells written to since the last call to pop_dirty(). This is None until
+        # track_dirty() is called, so grids with nothing drawing them don't collect
+        # every cell ever written.
+        self._dirty: set[tuple[int, int]] | None = None
 
         self._ants: list[Ant] = []
 
-        # Used for the "fast" bbox (which does not take into account true grid geometry)
-        self._has_data = False
-        self._min_x: int = 0
-        self._min_y: int = 0
-        self._max_x: int = 0
-        self._max_y: int = 0
+        # Maps each direction to the new direction for every turn (turn 1 at index 0)
+        self._direction_table = self._build_direction_table()
 
-    def __init_subclass__(cls, **kwargs):
-        cls._cell_vertices_cache = {}
+        # The same table, but with each direction replaced by its index in _headings,
+        # and the direction vectors as (dx, dy) pairs by heading. These are what
+        # Ant.step_many() uses, since indexing tuples is cheaper than hashing enums.
+        self._headings = tuple(sorted(self._direction_table))
+        self._heading_table = tuple(
+            tuple(self._headings.index(new) for new in self._direction_table[old])
+            for old in self._headings
+        )
+        # Vectors can differ between even and odd rows (eg in a HexGrid), so they're
+        # indexed by y & 1 first.
+        self._heading_vectors = tuple(
+            tuple(
+                (vectors[heading].dx, vectors[heading].dy) for heading in self._headings
+            )
+            for vectors in (
+                self.get_direction_vectors(GridCoord(0, 0)),
+                self.get_direction_vectors(GridCoord(0, 1)),
+            )
+        )
+
+        # Used for the "fast" bbox (which does not take into account true grid geometry).
+        # These start out inverted, so that the first write always sets them.
+        self._min_x: int = sys.maxsize
+        self._min_y: int = sys.maxsize
+        self._max_x: int = -sys.maxsize
+        self._max_y: int = -sys.maxsize
+
+        # The display bbox is built up from written cells on the edge of the bbox above,
+        # since no cell inside it can reach further out on screen. Those cells are
+        # queued here, and only folded in when the display bbox is asked for. It's a set
+        # so that an ant going back and forth along the edge only queues each cell once.
+        self._display_bbox: tuple[float, float, float, float] | None = None
+        self._display_bbox_pending: set[tuple[int, int]] = set()
 
     def add_ant(self, ant: Ant) -> None:
         self._ants.append(ant)
@@ -174,48 +586,84 @@ class Grid(ABC):
 
     def __contains__(self, coord: GridCoord) -> bool:
         self._check_coord(coord)
-        return coord in self._grid
+        return (coord.x, coord.y) in self._grid
 
     def __getitem__(self, coord: GridCoord) -> CellColour:
         self._check_coord(coord)
-        return self._grid.get(coord, self._default_colour)
+        return self._get(coord.x, coord.y)
+
+    def _get(self, x: int, y: int) -> CellColour:
+        # Unchecked version of __getitem__, for callers which know the cell is valid
+        return self._grid.get((x, y), self._default_colour)
 
     @property
     def bbox(self) -> tuple[int, int, int, int]:
+        if self._max_x < self._min_x:
+            # Nothing has been written yet
+            return 0, 0, 0, 0
         return self._min_x, self._min_y, self._max_x, self._max_y
 
+    def bbox_exceeds(self, limit: int) -> bool:
+        # Checks the tracked bounds directly rather than building the bbox tuple.
+        # An empty grid has its max below its min, so is never too big.
+        return self._max_x - self._min_x > limit or self._max_y - self._min_y > limit
+
     def __setitem__(self, coord: GridCoord, colour: CellColour) -> None:
         self._check_coord(coord)
+        self._set(coord.x, coord.y, colour)
+
+    def _set(self, x: int, y: int, colour: CellColour) -> None:
+        # Unchecked version of __setitem__, for callers which know the cell is valid
 
         # Update the bbox values
-        if self._has_data:
-            self._min_x = min(self._min_x, coord.x)
-            self._max_x = max(self._max_x, coord.x)
-            self._min_y = min(self._min_y, coord.y)
-            self._max_y = max(self._max_y, coord.y)
+        on_edge = False
+        if x <= self._min_x:
+            self._min_x = x
+            on_edge = True
+        if x >= self._max_x:
+            self._max_x = x
+            on_edge = True
+        if y <= self._min_y:
+            self._min_y = y
+            on_edge = True
+        if y >= self._max_y:
+            self._max_y = y
+            on_edge = True
+
+        key = (x, y)
+        if on_edge and self._queue_display_bbox_cells:
+            self._display_bbox_pending.add(key)
+        if not self._store_default and colour == self._default_colour:
+            self._grid.pop(key, None)
         else:
-            self._has_data = True
-            self._min_x = self._max_x = coord.x
-            self._min_y = self._max_y = coord.y
+            self._grid[key] = colour
 
-        if colour == self._default_colour and not self._store_default:
-            self._grid.pop(coord)
-        else:
-            self._grid[coord] = colour
+        if self._dirty is not None:
+            self._dirty.add(key)
+
+    def track_dirty(self) -> None:
+        """Starts keeping track of written cells for pop_dirty(), beginning with every cell."""
+        if self._dirty is None:
+            self._dirty = set(self._grid)
+
+    def pop_dirty(self) -> set[GridCoord]:
+        """Returns the cells written to since the last call, and resets the dirty set."""
+        dirty = self._dirty
+        if dirty is None:
+            # Nothing is tracking writes (see track_dirty())
+            return set()
+        self._dirty = set()
+        return {GridCoord(x, y) for x, y in dirty}
 
     def __iter__(self) -> Iterable[tuple[GridCoord, CellColour]]:
-        for coord, colour in self._grid.items():
-            yield coord, colour
+        for (x, y), colour in self._grid.items():
+            yield GridCoord(x, y), colour
 
     @classmethod
+    @lru_cache(maxsize=1 << 16)
     def get_cell_vertices(cls, coord: GridCoord) -> tuple[DisplayCoord, ...]:
         """Returns the 2d coordinates of the cell's vertices, to be used for rendering."""
-        try:
-            display_coords = cls._cell_vertices_cache[coord]
-        except KeyError:
-            display_coords = cls._get_cell_vertices(coord)
-            cls._cell_vertices_cache[coord] = display_coords
-        return display_coords
+        return cls._get_cell_vertices(coord)
 
     @classmethod
     @abstractmethod
@@ -237,46 +685,84 @@ class Grid(ABC):
         """Returns the centre point of the cell"""
         pass
 
+    @classmethod
+    def _get_cell_display_bbox(
+        cls, coord: GridCoord
+    ) -> tuple[float, float, float, float]:
+        # The display bbox of a single cell. Subclasses whose cells are all the same
+        # shape can work this out from the centre, without building the vertices.
+        vertices = cls.get_cell_vertices(coord)
+        return (
+            min(vertex.x for vertex in vertices),
+            min(vertex.y for vertex in vertices),
+            max(vertex.x for vertex in vertices),
+            max(vertex.y for vertex in vertices),
+        )
+
     def get_display_bbox(self) -> tuple[float, float, float, float]:
-        # This will probably be very inefficient when we have lots of coordinates...
-        coords = list(self._grid.keys())
+        """
+        Returns the bbox of every cell written to so far, in display coordinates.
 
-        if not coords:
-            return 0, 0, 0, 0
+        Like bbox, this includes cells which have since been set back to the default.
+        """
+        if self._display_bbox_pending:
+            coords = [GridCoord(x, y) for x, y in self._display_bbox_pending]
+            self._display_bbox_pending = set()
 
-        first = self.get_cell_vertices(coords[0])[0]
-        max_x = min_x = first.x
-        max_y = min_y = first.y
+            if self._display_bbox is None:
+                self._display_bbox = self._get_cell_display_bbox(coords[0])
+            min_x, min_y, max_x, max_y = self._display_bbox
 
-        for grid_coord in self._grid:
-            for display_coord in self.get_cell_vertices(grid_coord):
-                min_x = min(min_x, display_coord.x)
-                min_y = min(min_y, display_coord.y)
-                max_x = max(max_x, display_coord.x)
-                max_y = max(max_y, display_coord.y)
+            for cell_bbox in map(self._get_cell_display_bbox, coords):
+                min_x = min(min_x, cell_bbox[0])
+                min_y = min(min_y, cell_bbox[1])
+                max_x = max(max_x, cell_bbox[2])
+                max_y = max(max_y, cell_bbox[3])
 
-        return min_x, min_y, max_x, max_y
+            self._display_bbox = min_x, min_y, max_x, max_y
+
+        if self._display_bbox is None:
+            return 0, 0, 0, 0
+        return self._display_bbox
 
     @abstractmethod
     def get_direction_vectors(
         self, coord: GridCoord
-    ) -> dict[CardinalDirection, Vector]:
+    ) -> Mapping[CardinalDirection, Vector]:
         """Returns a mapping of directions to vectors for neighbours of the given grid coordinate."""
 
+    def _build_direction_table(
+        self,
+    ) -> dict[CardinalDirection, tuple[CardinalDirection, ...]]:
+        # 1 is forward, 2 is first step clockwise and so on
+        directions = sorted(self.get_direction_vectors(GridCoord(0, 0)).keys())
+        return {
+            old_direction: tuple(
+                directions[(old_index + turn) % len(directions)]
+                for turn in range(len(directions))
+            )
+            for old_index, old_direction in enumerate(directions)
+        }
+
     def get_direction(
         self, coord: GridCoord, old_direction: CardinalDirection, turn: int
     ) -> CardinalDirection:
-        # 1 is forward, 2 is first step clockwise and so on
-        turn = turn - 1
-        direction_vectors = self.get_direction_vectors(coord)
-        directions = sorted(direction_vectors.keys())
-        old_index = directions.index(old_direction)
-        return directions[(old_index + turn) % len(direction_vectors)]
+        try:
+            new_directions = self._direction_table[old_direction]
+        except KeyError:
+            raise InvalidDirection(old_direction, coord) from None
+        return new_directions[(turn - 1) % len(new_directions)]
 
     def _check_coord(self, coord: GridCoord):
         if not self._validate_coord(coord):
             raise InvalidCoord(coord)
 
+    def _check_heading(self, coord: GridCoord, direction: CardinalDirection):
+        # Checks that an ant in the cell, having last stepped in the given direction,
+        # can turn into one of the cell's directions
+        if direction not in self._direction_table:
+            raise InvalidDirection(direction, coord)
+
     def get_neighbour(
         self, coord: GridCoord, direction: CardinalDirection
     ) -> GridCoord:
@@ -284,7 +770,9 @@ class Grid(ABC):
         direction_vectors = self.get_direction_vectors(coord)
         if direction not in direction_vectors:
             raise InvalidDirection(direction, coord)
-        return coord + direction_vectors[direction]
+        # Build the neighbour directly, rather than going through GridCoord.__add__
+        vector = direction_vectors[direction]
+        return GridCoord(coord.x + vector.dx, coord.y + vector.dy)
 
     def _validate_coord(self, coord: GridCoord) -> bool:
         # All coords are valid in square and hex grids
@@ -296,47 +784,54 @@ class Grid(ABC):
         pass
 
     @classmethod
-    def _tokenise_lr_string(cls, lr_str: str) -> Iterable[str]:
+    @lru_cache
+    def _lr_token_pattern(cls) -> re.Pattern[str]:
         # We want to match greedily, so longest keys first.
         # Note this does not handle cases where tokens can run into one another ambiguously
         # (even if that ambiguity is resolved in the string as a whole).
+        # Regex alternation tries each option in order, so a single pattern does the
+        # whole scan in one pass.
         valid_tokens = sorted(cls.lr_directions().keys(), key=len, reverse=True)
+        return re.compile("|".join(map(re.escape, valid_tokens)))
 
-        lr_str_ = lr_str
+    @classmethod
+    def _tokenise_lr_string(cls, lr_str: str) -> Iterable[str]:
+        # Tokens are matched case-insensitively
+        token_pattern = cls._lr_token_pattern()
 
-        while lr_str_:
-            for token in valid_tokens:
-                if lr_str_.startswith(token):
-                    yield token
-                    lr_str_ = lr_str_[len(token) :]
-                    break
-            else:
+        lr_str_ = lr_str.upper()
+        pos = 0
+
+        while pos < len(lr_str_):
+            match = token_pattern.match(lr_str_, pos)
+            if match is None:
+                valid_tokens = sorted(cls.lr_directions().keys(), key=len, reverse=True)
                 raise ValueError(
                     f"Invalid LR string: {lr_str}. Valid tokens: {valid_tokens}"
                 )
+            yield match.group()
+            pos = match.end()
 
     @classmethod
     def rules_from_lr_string(cls, lr_string: str) -> list[Rule]:
         # LR string rules are all in ant colour 0, and have one cell colour per character.
         ant_colour = AntColour(0)
-        rules = []
         dirs = cls.lr_directions()
 
+        # The tokeniser only yields keys of lr_directions(), so every lookup succeeds
         rule_tokens = list(cls._tokenise_lr_string(lr_string))
-
-        for colour, turn_dir in enumerate(rule_tokens):
-            if turn_dir not in dirs:
-                raise ValueError(f"Bad LR string value for {cls.__name__}: {turn_dir}")
-
-            rules.append(
-                Rule(
-                    ant_colour=ant_colour,
-                    cell_colour=CellColour(colour),
-                    new_ant_colour=ant_colour,
-                    new_cell_colour=CellColour((colour + 1) % len(rule_tokens)),
-                    turn=dirs[turn_dir],
-                )
+        num_colours = len(rule_tokens)
+
+        rules = [
+            Rule(
+                ant_colour=ant_colour,
+                cell_colour=CellColour(colour),
+                new_ant_colour=ant_colour,
+                new_cell_colour=CellColour((colour + 1) % num_colours),
+                turn=dirs[turn_dir],
             )
+            for colour, turn_dir in enumerate(rule_tokens)
+        ]
 
         for i, rule in enumerate(rules):
             print(i, rule)
@@ -344,15 +839,31 @@ class Grid(ABC):
 
 
 class SquareGrid(Grid):
-    def get_direction_vectors(
-        self, coord: GridCoord
-    ) -> dict[CardinalDirection, Vector]:
-        return {
+    _VECTORS = MappingProxyType(
+        {
             CardinalDirection.NORTH: Vector(0, -1),
             CardinalDirection.EAST: Vector(1, 0),
             CardinalDirection.SOUTH: Vector(0, 1),
             CardinalDirection.WEST: Vector(-1, 0),
         }
+    )
+
+    _queue_display_bbox_cells = False
+
+    def get_direction_vectors(
+        self, coord: GridCoord
+    ) -> Mapping[CardinalDirection, Vector]:
+        return self._VECTORS
+
+    def _check_coord(self, coord: GridCoord):
+        # All coords are valid, so don't bother calling _validate_coord()
+        pass
+
+    def get_display_bbox(self) -> tuple[float, float, float, float]:
+        # Each cell is the unit square from (x, y) to (x + 1, y + 1)
+        if self._max_x < self._min_x:
+            return 0, 0, 0, 0
+        return self._min_x, self._min_y, self._max_x + 1, self._max_y + 1
 
     @classmethod
     def get_ant_angle(cls, direction: CardinalDirection) -> int:
@@ -413,28 +924,39 @@ class HexGrid(Grid):
     # We define centre to centre horizontally to be 1 unit.
     # Therefore the "size" of the hexagons (centre to any vertex) is 1/sqrt(3)
     SIZE = 3**-0.5
+    _HALF_SIZE = SIZE / 2
 
-    _EVEN_VECTORS = {
-        CardinalDirection.EAST: Vector(1, 0),
-        CardinalDirection.WEST: Vector(-1, 0),
-        CardinalDirection.NORTH_EAST: Vector(0, -1),
-        CardinalDirection.SOUTH_EAST: Vector(0, 1),
-        CardinalDirection.NORTH_WEST: Vector(-1, -1),
-        CardinalDirection.SOUTH_WEST: Vector(-1, 1),
-    }
-    _ODD_VECTORS = {
-        CardinalDirection.EAST: Vector(1, 0),
-        CardinalDirection.WEST: Vector(-1, 0),
-        CardinalDirection.NORTH_EAST: Vector(1, -1),
-        CardinalDirection.SOUTH_EAST: Vector(1, 1),
-        CardinalDirection.NORTH_WEST: Vector(0, -1),
-        CardinalDirection.SOUTH_WEST: Vector(0, 1),
-    }
+    _EVEN_VECTORS = MappingProxyType(
+        {
+            CardinalDirection.EAST: Vector(1, 0),
+            CardinalDirection.WEST: Vector(-1, 0),
+            CardinalDirection.NORTH_EAST: Vector(0, -1),
+            CardinalDirection.SOUTH_EAST: Vector(0, 1),
+            CardinalDirection.NORTH_WEST: Vector(-1, -1),
+            CardinalDirection.SOUTH_WEST: Vector(-1, 1),
+        }
+    )
+    _ODD_VECTORS = MappingProxyType(
+        {
+            CardinalDirection.EAST: Vector(1, 0),
+            CardinalDirection.WEST: Vector(-1, 0),
+            CardinalDirection.NORTH_EAST: Vector(1, -1),
+            CardinalDirection.SOUTH_EAST: Vector(1, 1),
+            CardinalDirection.NORTH_WEST: Vector(0, -1),
+            CardinalDirection.SOUTH_WEST: Vector(0, 1),
+        }
+    )
+    # Indexed by y & 1
+    _VECTORS_BY_PARITY = (_EVEN_VECTORS, _ODD_VECTORS)
 
     def get_direction_vectors(
         self, coord: GridCoord
-    ) -> dict[CardinalDirection, Vector]:
-        return self._EVEN_VECTORS if coord.y % 2 == 0 else self._ODD_VECTORS
+    ) -> Mapping[CardinalDirection, Vector]:
+        return self._VECTORS_BY_PARITY[coord.y & 1]
+
+    def _check_coord(self, coord: GridCoord):
+        # All coords are valid, so don't bother calling _validate_coord()
+        pass
 
     @classmethod
     def get_ant_angle(cls, direction: CardinalDirection) -> int:
@@ -464,8 +986,8 @@ class HexGrid(Grid):
         right_x = centre.x + 0.5
 
         top_y = centre.y + cls.SIZE
-        upper_mid_y = centre.y + cls.SIZE / 2
-        lower_mid_y = centre.y - cls.SIZE / 2
+        upper_mid_y = centre.y + cls._HALF_SIZE
+        lower_mid_y = centre.y - cls._HALF_SIZE
         bottom_y = centre.y - cls.SIZE
 
         return (
@@ -477,6 +999,20 @@ class HexGrid(Grid):
             DisplayCoord(left_x, upper_mid_y),
         )
 
+    @classmethod
+    def _get_cell_display_bbox(
+        cls, coord: GridCoord
+    ) -> tuple[float, float, float, float]:
+        # The widest points are the side edges, and the tallest are the top and
+        # bottom vertices
+        centre = cls.get_cell_centrepoint(coord)
+        return (
+            centre.x - 0.5,
+            centre.y - cls.SIZE,
+            centre.x + 0.5,
+            centre.y + cls.SIZE,
+        )
+
     @classmethod
     def get_cell_centrepoint(cls, coord: GridCoord) -> DisplayCoord:
         # Odd rows are offset by half
@@ -515,22 +1051,28 @@ class TriangleGrid(Grid):
     # This uses the triangular coordinate scheme outlined here:
     # https://github.com/mhwombat/grid/wiki/Implementation%3A-Triangular-tiles
 
-    _even_dirs = {
-        CardinalDirection.NORTH_EAST,
-        CardinalDirection.NORTH_WEST,
-        CardinalDirection.SOUTH,
-    }
-    _odd_dirs = {
-        CardinalDirection.NORTH,
-        CardinalDirection.SOUTH_WEST,
-        CardinalDirection.SOUTH_EAST,
-    }
+    _queue_display_bbox_cells = False
 
-    def get_direction_vectors(
-        self, coord: GridCoord
-    ) -> dict[CardinalDirection, Vector]:
-        # TODO: this is probably wrong
-        return {
+    _even_dirs = frozenset(
+        {
+            CardinalDirection.NORTH_EAST,
+            CardinalDirection.NORTH_WEST,
+            CardinalDirection.SOUTH,
+        }
+    )
+    _odd_dirs = frozenset(
+        {
+            CardinalDirection.NORTH,
+            CardinalDirection.SOUTH_WEST,
+            CardinalDirection.SOUTH_EAST,
+        }
+    )
+    # Indexed by x & 1
+    _dirs_by_parity = (_even_dirs, _odd_dirs)
+
+    # TODO: this is probably wrong
+    _VECTORS = MappingProxyType(
+        {
             CardinalDirection.NORTH: Vector(-1, 1),
             CardinalDirection.SOUTH: Vector(1, -1),
             CardinalDirection.SOUTH_EAST: Vector(1, -1),
@@ -538,32 +1080,42 @@ class TriangleGrid(Grid):
             CardinalDirection.SOUTH_WEST: Vector(-1, -1),
             CardinalDirection.NORTH_EAST: Vector(1, 1),
         }
+    )
 
-    def get_direction(
-        self, coord: GridCoord, old_direction: CardinalDirection, turn: int
-    ) -> CardinalDirection:
-        if old_direction in self._even_dirs:
-            old_dirs = self._even_dirs
-            new_dirs = self._odd_dirs
-        elif old_direction in self._odd_dirs:
-            old_dirs = self._odd_dirs
-            new_dirs = self._even_dirs
-            turn = turn - 1
-        else:
-            raise InvalidDirection(old_direction, coord)
+    def get_direction_vectors(
+        self, coord: GridCoord
+    ) -> Mapping[CardinalDirection, Vector]:
+        return self._VECTORS
 
-        old_index = sorted(old_dirs).index(old_direction)
-        # print(f"{old_index = }")
-        # print(f"{sorted(new_dirs) = }")
-        return sorted(new_dirs)[(old_index + turn) % 3]
+    def _build_direction_table(
+        self,
+    ) -> dict[CardinalDirection, tuple[CardinalDirection, ...]]:
+        # Ants always alternate between even and odd directions, since every
+        # neighbour of an even cell is odd (and vice versa).
+        even_dirs = sorted(self._even_dirs)
+        odd_dirs = sorted(self._odd_dirs)
+
+        table = {}
+        for old_index, old_direction in enumerate(even_dirs):
+            table[old_direction] = tuple(
+                odd_dirs[(old_index + turn) % 3] for turn in range(1, 4)
+            )
+        for old_index, old_direction in enumerate(odd_dirs):
+            table[old_direction] = tuple(
+                even_dirs[(old_index + turn) % 3] for turn in range(3)
+            )
+        return table
 
     def _validate_coord(self, coord: GridCoord) -> bool:
         # Only (odd, odd) or (even, even) coords are valid
-        return coord.x % 2 == coord.y % 2
+        return not (coord.x ^ coord.y) & 1
 
-    @staticmethod
-    def is_even(coord: GridCoord) -> bool:
-        return coord.x % 2 == 0
+    def _check_heading(self, coord: GridCoord, direction: CardinalDirection):
+        super()._check_heading(coord, direction)
+        # Every turn from an even direction leads to an odd direction (and vice versa),
+        # so the ant must have arrived from a cell of the other parity
+        if direction not in self._dirs_by_parity[(coord.x & 1) ^ 1]:
+            raise InvalidDirection(direction, coord)
 
     @classmethod
     def get_ant_angle(cls, direction: CardinalDirection) -> int:
@@ -588,21 +1140,15 @@ class TriangleGrid(Grid):
     def get_neighbour(
         self, coord: GridCoord, direction: CardinalDirection
     ) -> GridCoord:
+        # Check the coord first, to avoid misleading errors about invalid directions
+        # for invalid coordinates.
         self._check_coord(coord)
-        # The above check also happens later in the super() call, but it probably
-        # makes sense to catch it earlier to avoid misleading errors about invalid
-        # directions for invalid coordinates.
-
-        direction_vectors = self.get_direction_vectors(coord)
-        if direction not in direction_vectors:
-            raise InvalidDirection(direction, coord)
-
-        valid_dirs = self._even_dirs if self.is_even(coord) else self._odd_dirs
 
-        if direction not in valid_dirs:
+        if direction not in self._dirs_by_parity[coord.x & 1]:
             raise InvalidDirection(direction, coord)
 
-        return super().get_neighbour(coord, direction)
+        vector = self._VECTORS[direction]
+        return GridCoord(coord.x + vector.dx, coord.y + vector.dy)
 
     @classmethod
     def _get_cell_vertices(cls, coord: GridCoord) -> tuple[DisplayCoord, ...]:
@@ -613,6 +1159,22 @@ class TriangleGrid(Grid):
     def get_cell_centrepoint(cls, coord: GridCoord) -> DisplayCoord:
         raise NotImplementedError
 
+    def get_display_bbox(self) -> tuple[float, float, float, float]:
+        # Cells can't be drawn yet (see _get_cell_vertices), so nothing is queued;
+        # scan every cell instead, as this isn't on any hot path.
+        if not self._grid:
+            return 0, 0, 0, 0
+
+        cell_bboxes = [
+            self._get_cell_display_bbox(GridCoord(x, y)) for x, y in self._grid
+        ]
+        return (
+            min(cell_bbox[0] for cell_bbox in cell_bboxes),
+            min(cell_bbox[1] for cell_bbox in cell_bboxes),
+            max(cell_bbox[2] for cell_bbox in cell_bboxes),
+            max(cell_bbox[3] for cell_bbox in cell_bboxes),
+        )
+
     @classmethod
     def lr_directions(cls) -> dict[str, int]:
         return {
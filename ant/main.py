@@ -1,12 +1,20 @@
 import time
 from enum import StrEnum, auto
-from itertools import count
 
 import typer
 from graphics import tk  # type: ignore
 
 from ant.display import Display
-from ant.grid import Ant, AntState, Grid, GridCoord, HexGrid, SquareGrid, TriangleGrid
+from ant.grid import (
+    Ant,
+    AntState,
+    Grid,
+    GridCoord,
+    HexGrid,
+    SquareGrid,
+    TriangleGrid,
+    step_ants,
+)
 from ant.types import AntColour, CardinalDirection, Rule
 
 
@@ -48,6 +56,27 @@ def validate_ants(ants: list[Ant]) -> Grid:
     return grid
 
 
+def _step_ants_within_size(ants: list[Ant], steps: int, size_limit: int) -> int:
+    # Steps the ants, stopping as soon as the grid's bbox exceeds size_limit, and
+    # returns how many steps were taken. Every grid moves an ant at most one cell
+    # along each axis per step, so the batches are kept small enough that the bbox
+    # can't go past the limit part way through one.
+    grid = ants[0].grid
+    taken = 0
+    while taken < steps and not grid.bbox_exceeds(size_limit):
+        min_x, min_y, max_x, max_y = grid.bbox
+        for ant in ants:
+            position = ant.state.position
+            min_x, max_x = min(min_x, position.x), max(max_x, position.x)
+            min_y, max_y = min(min_y, position.y), max(max_y, position.y)
+        size = max(max_x - min_x, max_y - min_y)
+
+        batch = min(steps - taken, max(1, (size_limit - size) // len(ants)))
+        step_ants(ants, batch)
+        taken += batch
+    return taken
+
+
 def _run_live(
     ants: list[Ant],
     step_limit: int,
@@ -70,36 +99,39 @@ def _run_live(
     if manual_steps:
         steps_per_redraw = min(manual_steps, steps_per_redraw)
 
-    range_ = range(step_limit) if step_limit else count()
-    i = 0
-    for i in range_:
-        try:
-            for ant in ants:
-                ant.step()
-            manual_step = bool(manual_steps and i % manual_steps == 0)
-            if i % steps_per_redraw == 0 or manual_step:
-                display.render()
-                display.set_title(f"Ant: {i}")
-                if sleep_interval:
-                    time.sleep(sleep_interval)
-                if size_limit:
-                    xmin, ymin, xmax, ymax = grid.bbox
-                    if xmax - xmin > size_limit or ymax - ymin > size_limit:
-                        print(f"Exceeded maximum size {size_limit} after {i} steps")
-                        break
-                if manual_step:
-                    input(f"Step {i}; hit enter to continue")
-        except KeyboardInterrupt:
-            display.render()  # In case we interrupted it
-            display.set_title(f"Ant: {i}")
-            print()
-            break
-        except tk.TclError:
-            # Handle the window being closed
-            wait = False
-            break
-    else:
-        print(f"Ran for {i} steps")
+    steps = 0
+    try:
+        while not step_limit or steps < step_limit:
+            # Run the ants up to the next redraw (or manual step) in one go
+            batch = steps_per_redraw - steps % steps_per_redraw
+            if manual_steps:
+                batch = min(batch, manual_steps - steps % manual_steps)
+            if step_limit:
+                batch = min(batch, step_limit - steps)
+            if size_limit:
+                steps += _step_ants_within_size(ants, batch, size_limit)
+            else:
+                step_ants(ants, batch)
+                steps += batch
+
+            display.render()
+            display.set_title(f"Ant: {steps}")
+            if sleep_interval:
+                time.sleep(sleep_interval)
+            if size_limit and grid.bbox_exceeds(size_limit):
+                print(f"Exceeded maximum size {size_limit} after {steps} steps")
+                break
+            if manual_steps and steps % manual_steps == 0:
+                input(f"Step {steps}; hit enter to continue")
+        else:
+            print(f"Ran for {steps} steps")
+    except KeyboardInterrupt:
+        display.render()  # In case we interrupted it
+        display.set_title(f"Ant: {steps}")
+        print()
+    except tk.TclError:
+        # Handle the window being closed
+        wait = False
 
     if wait:
         input("Hit enter to exit")
@@ -112,14 +144,13 @@ def _run(
     title: str = "",
 ):
     grid = validate_ants(ants)
-    for i in range(step_limit):
-        for ant in ants:
-            ant.step()
-        if i % 10_000 == 0:
-            min_x, min_y, max_x, max_y = grid.bbox
-            if max_x - min_x > size_limit or max_y - min_y > size_limit:
-                break
-            print(f"After {i} steps, bbox: {grid.get_display_bbox()}")
+    steps = 0
+    while steps < step_limit:
+        batch = min(10_000, step_limit - steps)
+        steps += _step_ants_within_size(ants, batch, size_limit)
+        if grid.bbox_exceeds(size_limit):
+            break
+        print(f"After {steps} steps, bbox: {grid.get_display_bbox()}")
 
     # TODO: Dump as PNG
 
@@ -1,8 +1,11 @@
+import math
 from contextlib import nullcontext as does_not_raise
 
 import pytest
 
 from ant.grid import (
+    Ant,
+    AntState,
     DisplayCoord,
     GridCoord,
     HexGrid,
@@ -11,10 +14,51 @@ from ant.grid import (
     SquareGrid,
     TriangleGrid,
     Vector,
+    step_ants,
 )
 from ant.types import AntColour, CellColour, Rule, CardinalDirection
 
 
+# Coords and expectations shared between tests and parametrize tables
+_ORIGIN = GridCoord(0, 0)
+_C1N1 = GridCoord(1, -1)
+_C20 = GridCoord(2, 0)
+_OK = does_not_raise()
+
+# Expected grid contents for the iteration tests
+_EXPECTED_ITER = {_ORIGIN: CellColour(42), GridCoord(5, 5): CellColour(21)}
+_EXPECTED_ONE = {_ORIGIN: CellColour(42)}
+
+
+@pytest.fixture(
+    params=(TriangleGrid, SquareGrid, HexGrid), ids=("tri", "sq", "hex"), scope="module"
+)
+def grid_cls(request):
+    return request.param
+
+
+# Shared instances for tests which only read from the grid
+@pytest.fixture(scope="module")
+def empty_grid(grid_cls):
+    return grid_cls()
+
+
+@pytest.fixture(scope="module")
+def default999_grid(grid_cls):
+    return grid_cls(default_colour=CellColour(999))
+
+
+def _make_ant(grid, lr, direction, position=_ORIGIN, rules=None):
+    # Like ant.main.make_ant(), but on a grid of the test's choosing
+    return Ant(
+        grid=grid,
+        rules=grid.rules_from_lr_string(lr) if rules is None else rules,
+        initial_state=AntState(
+            position=position, direction=direction, colour=AntColour(0)
+        ),
+    )
+
+
 def test_adding_vectors_to_coords():
     coord = GridCoord(10, 10)
     vector = Vector(4, 1)
@@ -40,20 +84,14 @@ def test_adding_coords_fails():
         coord_1 + coord_2
 
 
-@pytest.mark.parametrize(["grid_cls"], [(TriangleGrid,), (SquareGrid,), (HexGrid,)])
-def test_empty_grid_returns_default_value(grid_cls):
-    grid = grid_cls()
-    assert grid[GridCoord(0, 0)] == 0
+def test_empty_grid_returns_default_value(empty_grid):
+    assert empty_grid[GridCoord(0, 0)] == 0
 
 
-@pytest.mark.parametrize(["grid_cls"], [(TriangleGrid,), (SquareGrid,), (HexGrid,)])
-def test_empty_grid_returns_custom_default_value(grid_cls):
-    some_colour = CellColour(999)
-    grid = grid_cls(default_colour=some_colour)
-    assert grid[GridCoord(123, 321)] == some_colour
+def test_empty_grid_returns_custom_default_value(default999_grid):
+    assert default999_grid[GridCoord(123, 321)] == CellColour(999)
 
 
-@pytest.mark.parametrize(["grid_cls"], [(TriangleGrid,), (SquareGrid,), (HexGrid,)])
 def test_saved_value_is_returned(grid_cls):
     grid = grid_cls()
     coord = GridCoord(10, 2)
@@ -62,7 +100,6 @@ def test_saved_value_is_returned(grid_cls):
     assert grid[coord] == some_colour
 
 
-@pytest.mark.parametrize(["grid_cls"], [(TriangleGrid,), (SquareGrid,), (HexGrid,)])
 def test_iter(grid_cls):
     grid = grid_cls()
 
@@ -72,13 +109,9 @@ def test_iter(grid_cls):
     grid[GridCoord(0, 0)] = some_colour
     grid[GridCoord(5, 5)] = other_colour
 
-    assert {k: v for k, v in grid} == {
-        GridCoord(0, 0): some_colour,
-        GridCoord(5, 5): other_colour,
-    }
+    assert dict(grid) == _EXPECTED_ITER
 
 
-@pytest.mark.parametrize(["grid_cls"], [(TriangleGrid,), (SquareGrid,), (HexGrid,)])
 def test_default_values_not_stored(grid_cls):
     grid = grid_cls()
 
@@ -89,10 +122,18 @@ def test_default_values_not_stored(grid_cls):
     grid[GridCoord(5, 5)] = other_colour
     grid[GridCoord(5, 5)] = CellColour(0)
 
-    assert {k: v for k, v in grid} == {GridCoord(0, 0): some_colour}
+    assert dict(grid) == _EXPECTED_ONE
+
+
+def test_setting_unset_cell_to_default(grid_cls):
+    grid = grid_cls()
+
+    grid[GridCoord(0, 0)] = CellColour(0)
+
+    assert grid[GridCoord(0, 0)] == CellColour(0)
+    assert dict(grid) == {}
 
 
-@pytest.mark.parametrize(["grid_cls"], [(TriangleGrid,), (SquareGrid,), (HexGrid,)])
 def test_custom_default_values_not_stored(grid_cls):
     default_colour = CellColour(999)
     some_colour = CellColour(42)
@@ -104,19 +145,19 @@ def test_custom_default_values_not_stored(grid_cls):
     grid[GridCoord(5, 5)] = other_colour
     grid[GridCoord(5, 5)] = default_colour
 
-    assert {k: v for k, v in grid} == {GridCoord(0, 0): some_colour}
+    assert dict(grid) == _EXPECTED_ONE
 
 
 @pytest.mark.parametrize(
     ["coord", "expectation"],
-    [
-        (GridCoord(0, 0), does_not_raise()),
-        (GridCoord(-1, -1), does_not_raise()),
+    (
+        (_ORIGIN, _OK),
+        (GridCoord(-1, -1), _OK),
         (GridCoord(1, 0), pytest.raises(InvalidCoord)),
         (GridCoord(-1, 0), pytest.raises(InvalidCoord)),
-        (GridCoord(-99999, 99999), does_not_raise()),
+        (GridCoord(-99999, 99999), _OK),
         (GridCoord(-99998, 99999), pytest.raises(InvalidCoord)),
-    ],
+    ),
 )
 def test_invalid_coords(coord, expectation):
     grid = TriangleGrid()
@@ -124,61 +165,112 @@ def test_invalid_coords(coord, expectation):
         assert grid[coord] == 0
 
 
-@pytest.mark.parametrize(
-    ["grid_cls", "coord", "direction", "expectation", "new_coord"],
-    # fmt: off
-    [
-        # Square grids only allow N, E, S, W
-        (SquareGrid, GridCoord(1, -1), CardinalDirection.NORTH, does_not_raise(), GridCoord(1, 0)),
-        (SquareGrid, GridCoord(1, -1), CardinalDirection.EAST, does_not_raise(), GridCoord(2, -1)),
-        (SquareGrid, GridCoord(1, -1), CardinalDirection.SOUTH, does_not_raise(), GridCoord(1, -2)),
-        (SquareGrid, GridCoord(1, -1), CardinalDirection.WEST, does_not_raise(), GridCoord(0, -1)),
-        # Diagonals are not allowed
-        (SquareGrid, GridCoord(1, -1), CardinalDirection.NORTH_EAST, pytest.raises(InvalidDirection), None),
-        (SquareGrid, GridCoord(1, -1), CardinalDirection.SOUTH_EAST, pytest.raises(InvalidDirection), None),
-        (SquareGrid, GridCoord(1, -1), CardinalDirection.SOUTH_WEST, pytest.raises(InvalidDirection), None),
-        (SquareGrid, GridCoord(1, -1), CardinalDirection.NORTH_WEST, pytest.raises(InvalidDirection), None),
-        # Hex grids have horizontal rows, so only N and S are disallowed
-        (HexGrid, GridCoord(1, -1), CardinalDirection.EAST, does_not_raise(), GridCoord(2, -1)),
-        (HexGrid, GridCoord(1, -1), CardinalDirection.WEST, does_not_raise(), GridCoord(0, -1)),
-        (HexGrid, GridCoord(1, -1), CardinalDirection.NORTH_EAST, does_not_raise(), GridCoord(1, 0)),
-        (HexGrid, GridCoord(1, -1), CardinalDirection.SOUTH_EAST, does_not_raise(), GridCoord(2, -2)),
-        (HexGrid, GridCoord(1, -1), CardinalDirection.SOUTH_WEST, does_not_raise(), GridCoord(1, -2)),
-        (HexGrid, GridCoord(1, -1), CardinalDirection.NORTH_WEST, does_not_raise(), GridCoord(0, 0)),
-        (HexGrid, GridCoord(1, -1), CardinalDirection.NORTH, pytest.raises(InvalidDirection), None),
-        (HexGrid, GridCoord(1, -1), CardinalDirection.SOUTH, pytest.raises(InvalidDirection), None),
-        # Triangle grids allow different directions depending on whether the cell is odd or even
-        # Odd cells:
-        (TriangleGrid, GridCoord(1, -1), CardinalDirection.NORTH, does_not_raise(), GridCoord(0, 0)),
-        (TriangleGrid, GridCoord(1, -1), CardinalDirection.SOUTH_WEST, does_not_raise(), GridCoord(0, -2)),
-        (TriangleGrid, GridCoord(1, -1), CardinalDirection.SOUTH_EAST, does_not_raise(), GridCoord(2, -2)),
-        (TriangleGrid, GridCoord(1, -1), CardinalDirection.EAST, pytest.raises(InvalidDirection), None),
-        (TriangleGrid, GridCoord(1, -1), CardinalDirection.SOUTH, pytest.raises(InvalidDirection), None),
-        (TriangleGrid, GridCoord(1, -1), CardinalDirection.WEST, pytest.raises(InvalidDirection), None),
-        (TriangleGrid, GridCoord(1, -1), CardinalDirection.NORTH_EAST, pytest.raises(InvalidDirection), None),
-        (TriangleGrid, GridCoord(1, -1), CardinalDirection.NORTH_WEST, pytest.raises(InvalidDirection), None),
-        # Even cells:
-        (TriangleGrid, GridCoord(2, 0), CardinalDirection.NORTH_WEST, does_not_raise(), GridCoord(1, 1)),
-        (TriangleGrid, GridCoord(2, 0), CardinalDirection.NORTH_EAST, does_not_raise(), GridCoord(3, 1)),
-        (TriangleGrid, GridCoord(2, 0), CardinalDirection.SOUTH, does_not_raise(), GridCoord(3, -1)),
-        (TriangleGrid, GridCoord(2, 0), CardinalDirection.NORTH, pytest.raises(InvalidDirection), None),
-        (TriangleGrid, GridCoord(2, 0), CardinalDirection.EAST, pytest.raises(InvalidDirection), None),
-        (TriangleGrid, GridCoord(2, 0), CardinalDirection.WEST, pytest.raises(InvalidDirection), None),
-        (TriangleGrid, GridCoord(2, 0), CardinalDirection.SOUTH_EAST, pytest.raises(InvalidDirection), None),
-        (TriangleGrid, GridCoord(2, 0), CardinalDirection.SOUTH_WEST, pytest.raises(InvalidDirection), None),
-    ],
-    # fmt: on
+# (grid_cls, coord, direction, neighbour), where a neighbour of None means the
+# direction is invalid from that cell
+# fmt: off
+_DIRECTION_CASES = (
+    # Square grids only allow N, E, S, W
+    (SquareGrid, _C1N1, CardinalDirection.NORTH, GridCoord(1, 0)),
+    (SquareGrid, _C1N1, CardinalDirection.EAST, GridCoord(2, -1)),
+    (SquareGrid, _C1N1, CardinalDirection.SOUTH, GridCoord(1, -2)),
+    (SquareGrid, _C1N1, CardinalDirection.WEST, GridCoord(0, -1)),
+    # Diagonals are not allowed
+    (SquareGrid, _C1N1, CardinalDirection.NORTH_EAST, None),
+    (SquareGrid, _C1N1, CardinalDirection.SOUTH_EAST, None),
+    (SquareGrid, _C1N1, CardinalDirection.SOUTH_WEST, None),
+    (SquareGrid, _C1N1, CardinalDirection.NORTH_WEST, None),
+    # Hex grids have horizontal rows, so only N and S are disallowed
+    (HexGrid, _C1N1, CardinalDirection.EAST, GridCoord(2, -1)),
+    (HexGrid, _C1N1, CardinalDirection.WEST, GridCoord(0, -1)),
+    (HexGrid, _C1N1, CardinalDirection.NORTH_EAST, GridCoord(1, 0)),
+    (HexGrid, _C1N1, CardinalDirection.SOUTH_EAST, GridCoord(2, -2)),
+    (HexGrid, _C1N1, CardinalDirection.SOUTH_WEST, GridCoord(1, -2)),
+    (HexGrid, _C1N1, CardinalDirection.NORTH_WEST, _ORIGIN),
+    (HexGrid, _C1N1, CardinalDirection.NORTH, None),
+    (HexGrid, _C1N1, CardinalDirection.SOUTH, None),
+    # Triangle grids allow different directions depending on whether the cell is odd or even
+    # Odd cells:
+    (TriangleGrid, _C1N1, CardinalDirection.NORTH, _ORIGIN),
+    (TriangleGrid, _C1N1, CardinalDirection.SOUTH_WEST, GridCoord(0, -2)),
+    (TriangleGrid, _C1N1, CardinalDirection.SOUTH_EAST, GridCoord(2, -2)),
+    (TriangleGrid, _C1N1, CardinalDirection.EAST, None),
+    (TriangleGrid, _C1N1, CardinalDirection.SOUTH, None),
+    (TriangleGrid, _C1N1, CardinalDirection.WEST, None),
+    (TriangleGrid, _C1N1, CardinalDirection.NORTH_EAST, None),
+    (TriangleGrid, _C1N1, CardinalDirection.NORTH_WEST, None),
+    # Even cells:
+    (TriangleGrid, _C20, CardinalDirection.NORTH_WEST, GridCoord(1, 1)),
+    (TriangleGrid, _C20, CardinalDirection.NORTH_EAST, GridCoord(3, 1)),
+    (TriangleGrid, _C20, CardinalDirection.SOUTH, GridCoord(3, -1)),
+    (TriangleGrid, _C20, CardinalDirection.NORTH, None),
+    (TriangleGrid, _C20, CardinalDirection.EAST, None),
+    (TriangleGrid, _C20, CardinalDirection.WEST, None),
+    (TriangleGrid, _C20, CardinalDirection.SOUTH_EAST, None),
+    (TriangleGrid, _C20, CardinalDirection.SOUTH_WEST, None),
 )
-def test_directions(grid_cls, coord, direction, expectation, new_coord):
-    grid = grid_cls()
-    with expectation:
+# fmt: on
+
+
+def _direction_params(grid_cls, prefix):
+    # Explicit ids, so pytest doesn't build one by repr-ing every argument
+    return tuple(
+        pytest.param(
+            cls,
+            coord,
+            direction,
+            new_coord,
+            id=f"{prefix}-{coord.x}_{coord.y}-{direction.name}",
+        )
+        for cls, coord, direction, new_coord in _DIRECTION_CASES
+        if cls is grid_cls
+    )
+
+
+_SQUARE_CASES = _direction_params(SquareGrid, "sq")
+_HEX_CASES = _direction_params(HexGrid, "hex")
+_TRI_CASES = _direction_params(TriangleGrid, "tri")
+
+
+def _check_neighbour(grid, coord, direction, new_coord):
+    if new_coord is None:
+        with pytest.raises(InvalidDirection):
+            grid.get_neighbour(coord, direction)
+    else:
         assert grid.get_neighbour(coord, direction) == new_coord
 
 
+# The grid comes from empty_grid, so each class's grid is shared between its cases
+@pytest.mark.parametrize(
+    ["grid_cls", "coord", "direction", "new_coord"],
+    _SQUARE_CASES,
+    indirect=["grid_cls"],
+)
+def test_directions_square(empty_grid, coord, direction, new_coord):
+    _check_neighbour(empty_grid, coord, direction, new_coord)
+
+
+@pytest.mark.parametrize(
+    ["grid_cls", "coord", "direction", "new_coord"],
+    _HEX_CASES,
+    indirect=["grid_cls"],
+)
+def test_directions_hex(empty_grid, coord, direction, new_coord):
+    _check_neighbour(empty_grid, coord, direction, new_coord)
+
+
+@pytest.mark.parametrize(
+    ["grid_cls", "coord", "direction", "new_coord"],
+    _TRI_CASES,
+    indirect=["grid_cls"],
+)
+def test_directions_triangle(empty_grid, coord, direction, new_coord):
+    _check_neighbour(empty_grid, coord, direction, new_coord)
+
+
 @pytest.mark.skip("TODO: Add coord to get_direction call")
 @pytest.mark.parametrize(
     ["grid_cls", "old_dir", "turn", "expected_new_dir"],
-    [
+    (
         (SquareGrid, CardinalDirection.NORTH, 1, CardinalDirection.NORTH),
         (SquareGrid, CardinalDirection.EAST, 1, CardinalDirection.EAST),
         (SquareGrid, CardinalDirection.SOUTH, 1, CardinalDirection.SOUTH),
@@ -204,84 +296,79 @@ def test_directions(grid_cls, coord, direction, expectation, new_coord):
         (TriangleGrid, CardinalDirection.NORTH_EAST, 1, CardinalDirection.SOUTH_EAST),
         (TriangleGrid, CardinalDirection.SOUTH, 1, CardinalDirection.SOUTH_WEST),
         (TriangleGrid, CardinalDirection.NORTH_WEST, 1, CardinalDirection.NORTH),
-    ],
+    ),
+    indirect=["grid_cls"],
 )
-def test_get_direction(grid_cls, old_dir, turn, expected_new_dir):
-    grid = grid_cls()
+def test_get_direction(empty_grid, old_dir, turn, expected_new_dir):
+    assert empty_grid.get_direction(old_dir, turn) == expected_new_dir
+
+
+_SQUARE_VERTICES_5_5 = (
+    DisplayCoord(5, 6),
+    DisplayCoord(6, 6),
+    DisplayCoord(6, 5),
+    DisplayCoord(5, 5),
+)
+
+# Centre to vertex distance of a hex cell, ie 1/sqrt(3)
+_SQRT3_3 = math.sqrt(3) / 3
 
-    assert grid.get_direction(old_dir, turn) == expected_new_dir
+_HEX_VERTICES_0_0 = (
+    DisplayCoord(0.0, _SQRT3_3),
+    DisplayCoord(0.5, _SQRT3_3 / 2),
+    DisplayCoord(0.5, -_SQRT3_3 / 2),
+    DisplayCoord(0.0, -_SQRT3_3),
+    DisplayCoord(-0.5, -_SQRT3_3 / 2),
+    DisplayCoord(-0.5, _SQRT3_3 / 2),
+)
+_HEX_VERTICES_1_0 = (
+    DisplayCoord(1.0, _SQRT3_3),
+    DisplayCoord(1.5, _SQRT3_3 / 2),
+    DisplayCoord(1.5, -_SQRT3_3 / 2),
+    DisplayCoord(1.0, -_SQRT3_3),
+    DisplayCoord(0.5, -_SQRT3_3 / 2),
+    DisplayCoord(0.5, _SQRT3_3 / 2),
+)
+# Row 1 is offset by half a cell horizontally, and its centre is 1.5 * size up
+_HEX_VERTICES_0_1 = (
+    DisplayCoord(0.5, 2.5 * _SQRT3_3),
+    DisplayCoord(1.0, 2 * _SQRT3_3),
+    DisplayCoord(1.0, _SQRT3_3),
+    DisplayCoord(0.5, _SQRT3_3 / 2),
+    DisplayCoord(0.0, _SQRT3_3),
+    DisplayCoord(0.0, 2 * _SQRT3_3),
+)
+_HEX_VERTICES_1_1 = (
+    DisplayCoord(1.5, 2.5 * _SQRT3_3),
+    DisplayCoord(2.0, 2 * _SQRT3_3),
+    DisplayCoord(2.0, _SQRT3_3),
+    DisplayCoord(1.5, _SQRT3_3 / 2),
+    DisplayCoord(1.0, _SQRT3_3),
+    DisplayCoord(1.0, 2 * _SQRT3_3),
+)
 
 
 @pytest.mark.parametrize(
     ["grid_cls", "grid_coord", "expected_display_coords"],
-    [
-        (
-            SquareGrid,
-            GridCoord(5, 5),
-            (
-                DisplayCoord(5, 6),
-                DisplayCoord(6, 6),
-                DisplayCoord(6, 5),
-                DisplayCoord(5, 5),
-            ),
-        ),
-        (
-            HexGrid,
-            GridCoord(0, 0),
-            (
-                DisplayCoord(0.0, 0.5773502691896257),
-                DisplayCoord(0.5, 0.28867513459481287),
-                DisplayCoord(0.5, -0.28867513459481287),
-                DisplayCoord(0.0, -0.5773502691896257),
-                DisplayCoord(-0.5, -0.28867513459481287),
-                DisplayCoord(-0.5, 0.28867513459481287),
-            ),
-        ),
-        (
-            HexGrid,
-            GridCoord(1, 0),
-            (
-                DisplayCoord(1.0, 0.5773502691896257),
-                DisplayCoord(1.5, 0.28867513459481287),
-                DisplayCoord(1.5, -0.28867513459481287),
-                DisplayCoord(1.0, -0.5773502691896257),
-                DisplayCoord(0.5, -0.28867513459481287),
-                DisplayCoord(0.5, 0.28867513459481287),
-            ),
-        ),
-        (
-            HexGrid,
-            GridCoord(0, 1),
-            (
-                DisplayCoord(0.5, 1.4433756729740645),
-                DisplayCoord(1.0, 1.1547005383792515),
-                DisplayCoord(1.0, 0.5773502691896258),
-                DisplayCoord(0.5, 0.288675134594813),
-                DisplayCoord(0.0, 0.5773502691896258),
-                DisplayCoord(0.0, 1.1547005383792515),
-            ),
-        ),
-        (
-            HexGrid,
-            GridCoord(1, 1),
-            (
-                DisplayCoord(1.5, 1.4433756729740645),
-                DisplayCoord(2.0, 1.1547005383792515),
-                DisplayCoord(2.0, 0.5773502691896258),
-                DisplayCoord(1.5, 0.288675134594813),
-                DisplayCoord(1.0, 0.5773502691896258),
-                DisplayCoord(1.0, 1.1547005383792515),
-            ),
-        ),
-    ],
+    (
+        (SquareGrid, GridCoord(5, 5), _SQUARE_VERTICES_5_5),
+        (HexGrid, GridCoord(0, 0), _HEX_VERTICES_0_0),
+        (HexGrid, GridCoord(1, 0), _HEX_VERTICES_1_0),
+        (HexGrid, GridCoord(0, 1), _HEX_VERTICES_0_1),
+        (HexGrid, GridCoord(1, 1), _HEX_VERTICES_1_1),
+    ),
 )
 def test_get_cell_vertices(grid_cls, grid_coord, expected_display_coords):
-    assert grid_cls.get_cell_vertices(grid_coord) == expected_display_coords
+    # Compare with a tolerance, as the exact floats depend on the order of operations
+    vertices = grid_cls.get_cell_vertices(grid_coord)
+    assert len(vertices) == len(expected_display_coords)
+    for vertex, expected in zip(vertices, expected_display_coords):
+        assert vertex == pytest.approx(expected)
 
 
 @pytest.mark.parametrize(
     ["grid_cls", "grid_coords", "expected_bbox"],
-    [
+    (
         (
             SquareGrid,
             [],
@@ -322,7 +409,7 @@ def test_get_cell_vertices(grid_cls, grid_coord, expected_display_coords):
             [GridCoord(0, 0), GridCoord(-1, -1), GridCoord(5, 5)],
             (-1.0, -1.4433756729740645, 6.0, 4.907477288111819),
         ),
-    ],
+    ),
 )
 def test_get_display_bbox(grid_cls, grid_coords, expected_bbox):
     grid = grid_cls()
@@ -334,7 +421,7 @@ def test_get_display_bbox(grid_cls, grid_coords, expected_bbox):
 
 @pytest.mark.parametrize(
     ["grid_cls", "lr_string", "expected"],
-    [
+    (
         (
             SquareGrid,
             "LR",
@@ -402,7 +489,266 @@ def test_get_display_bbox(grid_cls, grid_coords, expected_bbox):
                 ),
             ],
         ),
-    ],
+    ),
 )
 def test_rules_from_lr_string(grid_cls, lr_string, expected):
     assert grid_cls.rules_from_lr_string(lr_string) == expected
+
+
+def test_rules_from_lr_string_multi_char_tokens():
+    # Two-character tokens are matched whole, and match their one-letter synonyms
+    rules = HexGrid.rules_from_lr_string("r1L2nR2l1U")
+    assert len(rules) == 6
+    assert rules == HexGrid.rules_from_lr_string("REFILB")
+
+
+def test_ant_missing_rule_raises():
+    grid = SquareGrid()
+    grid[GridCoord(0, 0)] = CellColour(2)
+    ant = _make_ant(grid, "LR", CardinalDirection.NORTH)
+    with pytest.raises(KeyError):
+        ant.step()
+
+
+@pytest.mark.parametrize("default_colour", (-1, -2))
+def test_ant_negative_cell_colour_raises(default_colour):
+    # Negative colours must not wrap round to the end of the rule table
+    grid = SquareGrid(default_colour=CellColour(default_colour))
+    ant = _make_ant(grid, "LR", CardinalDirection.NORTH)
+    with pytest.raises(KeyError):
+        ant.step()
+
+
+def test_ant_negative_ant_colour_raises():
+    rules = SquareGrid.rules_from_lr_string("LR")
+    with pytest.raises(ValueError):
+        _make_ant(
+            SquareGrid(),
+            "LR",
+            CardinalDirection.NORTH,
+            rules=rules + [rules[0]._replace(ant_colour=AntColour(-1))],
+        )
+
+
+@pytest.mark.parametrize("method", ("step", "step_many"))
+def test_langtons_ant_after_11000_steps(method):
+    # Worked out separately, rather than by comparing against another way of stepping
+    grid = SquareGrid()
+    ant = _make_ant(grid, "RL", CardinalDirection.NORTH)
+
+    if method == "step":
+        for _ in range(11_000):
+            ant.step()
+    else:
+        ant.step_many(11_000)
+
+    assert ant.state == AntState(
+        position=GridCoord(-34, 14),
+        direction=CardinalDirection.SOUTH,
+        colour=AntColour(0),
+    )
+    assert ant.prev_position == GridCoord(-34, 13)
+    assert sum(colour == 1 for _, colour in grid) == 834
+
+
+def test_pop_dirty(grid_cls):
+    grid = grid_cls()
+    grid.track_dirty()
+
+    grid[GridCoord(0, 0)] = CellColour(1)
+    grid[GridCoord(5, 5)] = CellColour(2)
+    grid[GridCoord(0, 0)] = CellColour(0)
+
+    assert grid.pop_dirty() == {GridCoord(0, 0), GridCoord(5, 5)}
+    assert grid.pop_dirty() == set()
+
+
+def test_pop_dirty_untracked(grid_cls):
+    # Without a display calling track_dirty(), writes aren't kept
+    grid = grid_cls()
+    grid[GridCoord(0, 0)] = CellColour(1)
+    assert grid.pop_dirty() == set()
+
+    # Tracking starts from every cell already stored
+    grid.track_dirty()
+    grid[GridCoord(5, 5)] = CellColour(2)
+    assert grid.pop_dirty() == {GridCoord(0, 0), GridCoord(5, 5)}
+
+
+def test_ant_duplicate_rules_warns():
+    rules = SquareGrid.rules_from_lr_string("LR")
+    duplicate = rules[0]._replace(turn=1)
+
+    with pytest.warns(UserWarning, match="Duplicate rules") as record:
+        ant = _make_ant(
+            SquareGrid(), "LR", CardinalDirection.NORTH, rules=rules + [duplicate]
+        )
+
+    # The warning points at whoever passed the rules
+    assert record[0].filename == __file__
+
+    # The last duplicate wins, so the ant goes straight on
+    ant.step()
+    assert ant.state.position == GridCoord(0, -1)
+
+
+def test_ant_invalid_start_position_raises():
+    with pytest.raises(InvalidCoord):
+        _make_ant(
+            TriangleGrid(), "RL", CardinalDirection.NORTH, position=GridCoord(1, 0)
+        )
+
+
+@pytest.mark.parametrize(
+    ["position", "direction"],
+    (
+        (GridCoord(0, 0), CardinalDirection.SOUTH),
+        (GridCoord(1, 1), CardinalDirection.NORTH),
+        (GridCoord(0, 0), CardinalDirection.EAST),
+    ),
+)
+def test_ant_invalid_start_direction_raises(position, direction):
+    # Triangle cells only have three directions, which depend on the cell's parity
+    with pytest.raises(InvalidDirection):
+        _make_ant(TriangleGrid(), "RL", direction, position=position)
+
+
+@pytest.mark.parametrize(["grid_cls"], ((SquareGrid,), (HexGrid,)))
+def test_bbox(grid_cls):
+    grid = grid_cls()
+    assert grid.bbox == (0, 0, 0, 0)
+
+    grid[GridCoord(3, -2)] = CellColour(1)
+    assert grid.bbox == (3, -2, 3, -2)
+
+    grid[GridCoord(-1, 5)] = CellColour(1)
+    assert grid.bbox == (-1, -2, 3, 5)
+
+
+@pytest.mark.parametrize(["grid_cls"], ((SquareGrid,), (HexGrid,)))
+def test_bbox_exceeds(grid_cls):
+    grid = grid_cls()
+    assert not grid.bbox_exceeds(0)
+
+    grid[GridCoord(3, -2)] = CellColour(1)
+    assert not grid.bbox_exceeds(0)
+
+    grid[GridCoord(-1, 5)] = CellColour(1)
+    assert grid.bbox_exceeds(6)
+    assert not grid.bbox_exceeds(7)
+
+
+@pytest.mark.parametrize(
+    ["grid_cls", "lr_string", "direction"],
+    (
+        (SquareGrid, "RL", CardinalDirection.NORTH),
+        (HexGrid, "LRRRRRLLR", CardinalDirection.NORTH_WEST),
+    ),
+)
+def test_get_display_bbox_is_kept_up_to_date(grid_cls, lr_string, direction):
+    grid = grid_cls(store_default=True)
+    ant = _make_ant(grid, lr_string, direction)
+
+    for _ in range(20):
+        ant.step_many(50)
+        vertices = [v for coord, _ in grid for v in grid.get_cell_vertices(coord)]
+        assert grid.get_display_bbox() == (
+            min(v.x for v in vertices),
+            min(v.y for v in vertices),
+            max(v.x for v in vertices),
+            max(v.y for v in vertices),
+        )
+
+
+def test_triangle_grid_display_bbox():
+    grid = TriangleGrid()
+    assert grid.get_display_bbox() == (0, 0, 0, 0)
+
+    # Triangle cells have no vertices yet
+    grid[GridCoord(0, 0)] = CellColour(1)
+    with pytest.raises(NotImplementedError):
+        grid.get_display_bbox()
+
+
+def test_step_ants():
+    # Worked through by hand: each ant draws a square, and on its sixth step the
+    # second ant lands on (1, 0), which the first ant turned black on its first step,
+    # so turns left rather than right.
+    grid = SquareGrid()
+    ants = [
+        _make_ant(grid, "RL", CardinalDirection.NORTH),
+        _make_ant(grid, "RL", CardinalDirection.NORTH, position=_C20),
+    ]
+
+    step_ants(ants, 6)
+
+    assert [ant.state for ant in ants] == [
+        AntState(GridCoord(-1, -1), CardinalDirection.NORTH, AntColour(0)),
+        AntState(GridCoord(1, 1), CardinalDirection.SOUTH, AntColour(0)),
+    ]
+    assert [ant.prev_position for ant in ants] == [GridCoord(-1, 0), GridCoord(1, 0)]
+    assert dict(grid) == {
+        coord: CellColour(1)
+        for coord in (
+            GridCoord(-1, 0),
+            GridCoord(0, 1),
+            GridCoord(1, 1),
+            GridCoord(2, 1),
+            GridCoord(3, 0),
+            GridCoord(3, 1),
+        )
+    }
+
+
+@pytest.mark.parametrize(
+    ["grid_cls", "lr_string", "direction"],
+    (
+        # Langton's ant builds its highway after about 10,000 steps
+        (SquareGrid, "RL", CardinalDirection.NORTH),
+        # Goes back and forth between two cells forever
+        (SquareGrid, "B", CardinalDirection.NORTH),
+        # Repeats itself, but not for long enough to skip
+        (SquareGrid, "LLRR", CardinalDirection.NORTH),
+        (HexGrid, "RU", CardinalDirection.NORTH_WEST),
+        (HexGrid, "LRRRRRLLR", CardinalDirection.NORTH_WEST),
+        (TriangleGrid, "RRL", CardinalDirection.NORTH),
+    ),
+)
+def test_ant_fast_forward_matches_step_many(grid_cls, lr_string, direction):
+    ants = [_make_ant(grid_cls(), lr_string, direction) for _ in range(2)]
+    for ant in ants:
+        ant.grid.track_dirty()
+
+    ants[0].step_many(15_000)
+    ants[1].fast_forward(15_000)
+
+    assert ants[0].state == ants[1].state
+    assert ants[0].prev_position == ants[1].prev_position
+    assert dict(ants[0].grid) == dict(ants[1].grid)
+    assert ants[0].grid.bbox == ants[1].grid.bbox
+    assert ants[0].grid.pop_dirty() == ants[1].grid.pop_dirty()
+
+
+@pytest.mark.parametrize(
+    ["lr_string", "steps"],
+    (
+        # Langton's ant is well onto its highway by then
+        ("RL", 15_000),
+        ("B", 1_000),
+    ),
+)
+def test_ant_fast_forward_skips_cycles(monkeypatch, lr_string, steps):
+    skip_cycles = Ant._skip_cycles
+    skipped = []
+
+    def counting_skip_cycles(self, cycle, max_cycles):
+        cycles = skip_cycles(self, cycle, max_cycles)
+        skipped.append(cycles * cycle.period)
+        return cycles
+
+    monkeypatch.setattr(Ant, "_skip_cycles", counting_skip_cycles)
+
+    ant = _make_ant(SquareGrid(), lr_string, CardinalDirection.NORTH)
+    ant.fast_forward(steps)
+
+    assert sum(skipped) > 0